@@ -0,0 +1,214 @@
+import streamlit as st
+import fitz  # PyMuPDF
+import re
+import os
+import shutil
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+import openai
+import torch
+from transformers import AutoTokenizer, pipeline
+from sklearn.feature_extraction.text import HashingVectorizer
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+except ImportError:
+    ORTModelForSeq2SeqLM = None
+
+# --- Load OpenAI Key ---
+OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"] if "OPENAI_API_KEY" in st.secrets else os.getenv("OPENAI_API_KEY")
+
+# --- PDF Text Extraction ---
+def iter_pdf_pages(data: bytes):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for i, page in enumerate(doc):
+            yield ("\n" if i else "") + page.get_text("text")
+
+def pdf_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+# Extracted text shared across sessions. It is filled after a streamed extraction
+# finishes, which st.cache_data cannot do, so it is an explicit LRU dict.
+PDF_TEXT_CACHE_SIZE = 32
+_PDF_TEXT_LOCK = threading.Lock()
+
+@st.cache_resource
+def _pdf_text_cache():
+    return OrderedDict()
+
+def get_cached_pdf_text(key):
+    cache = _pdf_text_cache()
+    with _PDF_TEXT_LOCK:
+        if key in cache:
+            cache.move_to_end(key)
+        return cache.get(key)
+
+def cache_pdf_text(key, text):
+    cache = _pdf_text_cache()
+    with _PDF_TEXT_LOCK:
+        cache[key] = text
+        cache.move_to_end(key)
+        while len(cache) > PDF_TEXT_CACHE_SIZE:
+            cache.popitem(last=False)
+
+# --- Summarization ---
+SUMMARIZER_MODEL = "facebook/bart-large-cnn"
+# One export per model, next to this file rather than in the working directory
+ONNX_MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "onnx_model", SUMMARIZER_MODEL.replace("/", "--")
+)
+ONNX_EXPORT_FILES = ("config.json", "encoder_model.onnx")
+
+def load_onnx_summarizer():
+    # Export to ONNX once and reuse the saved graph on later starts
+    if "CUDAExecutionProvider" in onnxruntime.get_available_providers():
+        provider = "CUDAExecutionProvider"
+    else:
+        provider = "CPUExecutionProvider"
+    if all(os.path.isfile(os.path.join(ONNX_MODEL_DIR, f)) for f in ONNX_EXPORT_FILES):
+        model = ORTModelForSeq2SeqLM.from_pretrained(ONNX_MODEL_DIR, provider=provider)
+        tokenizer = AutoTokenizer.from_pretrained(ONNX_MODEL_DIR, use_fast=True)
+    else:
+        model = ORTModelForSeq2SeqLM.from_pretrained(SUMMARIZER_MODEL, export=True, provider=provider)
+        tokenizer = AutoTokenizer.from_pretrained(SUMMARIZER_MODEL, use_fast=True)
+        # Save to a scratch directory and rename it into place so an interrupted export is never loaded
+        tmp_dir = ONNX_MODEL_DIR + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        model.save_pretrained(tmp_dir)
+        tokenizer.save_pretrained(tmp_dir)
+        shutil.rmtree(ONNX_MODEL_DIR, ignore_errors=True)
+        os.replace(tmp_dir, ONNX_MODEL_DIR)
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+@st.cache_resource
+def load_summarizer():
+    if ORTModelForSeq2SeqLM is not None:
+        return load_onnx_summarizer()
+    if torch.cuda.is_available():
+        device, dtype = 0, torch.float16
+    else:
+        device, dtype = -1, torch.float32
+    tokenizer = AutoTokenizer.from_pretrained(SUMMARIZER_MODEL, use_fast=True)
+    summarizer = pipeline(
+        "summarization",
+        model=SUMMARIZER_MODEL,
+        tokenizer=tokenizer,
+        device=device,
+        torch_dtype=dtype,
+        model_kwargs={"attn_implementation": "sdpa"}
+    )
+    if device == -1:
+        # Linear layers dominate CPU inference; int8 weights halve memory traffic
+        summarizer.model = torch.ao.quantization.quantize_dynamic(
+            summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return summarizer
+
+# Windows stay under the model's 1024-token limit; consecutive windows share
+# CHUNK_TOKENS - CHUNK_STRIDE tokens, and the last window always ends at the final token
+CHUNK_TOKENS = 1000
+CHUNK_STRIDE = 900
+
+def summarize_text(text):
+    summarizer = load_summarizer()
+    tokenizer = summarizer.tokenizer
+    ids = tokenizer(text, add_special_tokens=False, truncation=False)["input_ids"]
+    if not ids:
+        return ""
+    # Stop before a tail that would fall entirely inside the previous window's overlap
+    last_start = max(len(ids) - (CHUNK_TOKENS - CHUNK_STRIDE), 1)
+    windows = [ids[i:i+CHUNK_TOKENS] for i in range(0, last_start, CHUNK_STRIDE)]
+    chunks = tokenizer.batch_decode(windows, skip_special_tokens=True)
+    outputs = summarizer(chunks, batch_size=8, max_length=130, min_length=30, do_sample=False, truncation=True)
+    return " ".join(o['summary_text'] for o in outputs)
+
+# --- Clause Extraction ---
+clause_keywords = {
+    "Confidentiality": ["confidential", "non-disclosure", "privacy"],
+    "Termination": ["terminate", "termination", "cancel", "end of agreement"],
+    "Payment": ["payment", "compensation", "fee", "remuneration"],
+    "Governing Law": ["jurisdiction", "governing law", "under the laws of"],
+    "Indemnity": ["indemnify", "liability", "hold harmless"],
+    "Force Majeure": ["force majeure", "act of god", "unforeseen circumstances"],
+    "Dispute Resolution": ["arbitration", "dispute", "litigation", "settlement"]
+}
+
+# Patterns match against lowercased sentences, so keywords are lowercased once here
+CLAUSE_LOWER_KWS = [
+    (clause, tuple(k.lower() for k in keywords))
+    for clause, keywords in clause_keywords.items()
+]
+CLAUSE_PATTERNS = [
+    (clause, re.compile("|".join(map(re.escape, keywords))))
+    for clause, keywords in CLAUSE_LOWER_KWS
+]
+_SENT_RE = re.compile(r'(?<=[.!?]) +')
+
+def extract_clauses(text):
+    extracted_clauses = {}
+    sentences = _SENT_RE.split(text)
+    lows = [s.lower() for s in sentences]
+    for clause, pattern in CLAUSE_PATTERNS:
+        matched_sentences = [sentences[i].strip() for i, low in enumerate(lows) if pattern.search(low)]
+        if matched_sentences:
+            extracted_clauses[clause] = matched_sentences
+    return extracted_clauses
+
+# --- Risk Detection ---
+RISKY_KEYWORDS = ["terminate", "penalty", "breach", "liability", "indemnify", "damages"]
+RISKY_RE = re.compile("|".join(map(re.escape, RISKY_KEYWORDS)), re.IGNORECASE)
+
+def find_risky_clauses(clauses):
+    return [c for c in clauses if RISKY_RE.search(c)]
+
+# --- Clause Comparison ---
+# Stateless projection for one-off pairs, so no vocabulary is fitted per comparison
+HASHING_VECTORIZER = HashingVectorizer(n_features=2**14, alternate_sign=False, norm="l2")
+
+def compare_clause_similarity(clause, reference_clause):
+    vectors = HASHING_VECTORIZER.transform([clause, reference_clause])
+    return float((vectors[0] @ vectors[1].T).toarray()[0, 0])
+
+# --- AI Clause Rewriting ---
+@st.cache_resource
+def get_openai_client():
+    return openai.OpenAI(api_key=OPENAI_API_KEY)
+
+def _rewrite_request(clause):
+    prompt = f"Rewrite the following legal clause in a clearer, more standard form:\n\n\"{clause}\""
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=200,
+        temperature=0.7
+    )
+
+def rewrite_clause_with_ai(clause):
+    try:
+        response = get_openai_client().chat.completions.create(**_rewrite_request(clause))
+    except openai.OpenAIError:
+        return None
+    return response.choices[0].message.content.strip()
+
+# Concurrent requests per batch, kept low to stay clear of rate limits
+REWRITE_CONCURRENCY = 4
+
+async def _rewrite_one(client, semaphore, clause):
+    async with semaphore:
+        try:
+            response = await client.chat.completions.create(**_rewrite_request(clause))
+        except openai.OpenAIError:
+            return None
+    return response.choices[0].message.content.strip()
+
+async def _rewrite_clauses_async(clauses):
+    # The async client is tied to the event loop, so it lives for one batch only
+    semaphore = asyncio.Semaphore(REWRITE_CONCURRENCY)
+    async with openai.AsyncOpenAI(api_key=OPENAI_API_KEY) as client:
+        return await asyncio.gather(*(_rewrite_one(client, semaphore, c) for c in clauses))
+
+def rewrite_clauses_with_ai(clauses):
+    return asyncio.run(_rewrite_clauses_async(clauses))